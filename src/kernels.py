@@ -0,0 +1,285 @@
+# Low-level matrix-filling kernels for the alignment algorithms
+#
+# When numba is installed, the dynamic programming fill runs as a compiled kernel
+# on integer-encoded sequences; otherwise SequenceAlignment falls back to a
+# pure-Python loop.
+
+import ctypes
+import os
+import shutil
+import subprocess
+
+import numpy as np
+from numpy.ctypeslib import ndpointer
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Direction bits packed into one uint8 per cell of the directional matrix
+UP = 0b100
+DIAGONAL = 0b010
+LEFT = 0b001
+
+# Below this matrix size the per-diagonal slicing overhead of the vectorized
+# fill outweighs its gain over the plain Python loop
+VECTORIZE_THRESHOLD = 1024
+
+# Minimum sequence length before anti-diagonals are long enough for the
+# per-diagonal thread synchronization of the parallel fill to pay off
+PARALLEL_THRESHOLD = 1024
+
+# Sentinel score for cells outside the alignment band, low enough that no real
+# path can go through them but far from the int32 overflow boundary
+OFF_BAND = -(2 ** 30)
+
+_C_SOURCE = os.path.join(os.path.dirname(__file__), '_sw_simd.c')
+_C_LIBRARY = os.path.join(os.path.dirname(__file__), '_sw_simd.so')
+
+
+def _load_c_kernel():
+    # Build the shared library on first use with the system C compiler, if any
+    if not os.path.exists(_C_LIBRARY) or os.path.getmtime(_C_LIBRARY) < os.path.getmtime(_C_SOURCE):
+        compiler = shutil.which('cc') or shutil.which('gcc') or shutil.which('clang')
+        if compiler is None:
+            return None
+        command = [compiler, '-O3', '-march=native', '-shared', '-fPIC', _C_SOURCE, '-o', _C_LIBRARY]
+        if subprocess.run(command, capture_output=True).returncode != 0:
+            # Retry without -march=native for compilers that do not support it
+            command.remove('-march=native')
+            if subprocess.run(command, capture_output=True).returncode != 0:
+                return None
+
+    fill = ctypes.CDLL(_C_LIBRARY).fill
+    fill.restype = None
+    fill.argtypes = [ndpointer(np.int8, flags='C'), ctypes.c_int,
+                     ndpointer(np.int8, flags='C'), ctypes.c_int,
+                     ndpointer(np.int32, flags='C'), ctypes.c_int,
+                     ctypes.c_int32, ctypes.c_int,
+                     ndpointer(np.int32, flags='C'), ndpointer(np.uint8, flags='C')]
+    return fill
+
+
+_fill_c = _load_c_kernel()
+SIMD_AVAILABLE = _fill_c is not None
+
+
+def fill_simd(encoded1, encoded2, substitution_scores, gap_penalty,
+              score_matrix, directional_matrix, local):
+    """Fills the score and directional matrices with the compiled C kernel"""
+    _fill_c(encoded1, encoded1.shape[0], encoded2, encoded2.shape[0],
+            substitution_scores, substitution_scores.shape[1],
+            gap_penalty, local, score_matrix, directional_matrix)
+
+
+def fill_numpy(encoded1, encoded2, substitution_scores, gap_penalty,
+               score_matrix, directional_matrix, local):
+    """Fills the score and directional matrices one anti-diagonal at a time
+
+    Cells on anti-diagonal k depend only on diagonals k-1 and k-2, so every
+    diagonal can be computed with a single vectorized maximum. Used as the
+    fallback for larger matrices when numba is not installed.
+    """
+    n, m = encoded1.shape[0], encoded2.shape[0]
+    # Full pairwise substitution scores, indexed once by the encoded nucleotides
+    pair_scores = substitution_scores[encoded1[:, None], encoded2[None, :]]
+
+    for k in range(2, n + m + 1):
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+
+        # Scores from possible three directions
+        diagonal_scores = score_matrix[i - 1, j - 1] + pair_scores[i - 1, j - 1]
+        up_scores = score_matrix[i - 1, j] + gap_penalty
+        left_scores = score_matrix[i, j - 1] + gap_penalty
+
+        # Save the best scores from the directions
+        best_scores = np.maximum(np.maximum(up_scores, diagonal_scores), left_scores)
+        if local:  # Minimum 0 in local alignment
+            np.maximum(best_scores, 0, out=best_scores)
+        score_matrix[i, j] = best_scores
+
+        # Pack possible paths for backtracking into direction bits
+        directional_matrix[i, j] = ((up_scores == best_scores).astype(np.uint8) << 2
+                                    | (diagonal_scores == best_scores).astype(np.uint8) << 1
+                                    | (left_scores == best_scores).astype(np.uint8))
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def fill_numba(encoded1, encoded2, substitution_scores, gap_penalty,
+                   score_matrix, directional_matrix, local):
+        """Fills the score and directional matrices for integer-encoded sequences"""
+        for i in range(1, encoded1.shape[0] + 1):
+            nucleotide1 = encoded1[i - 1]
+            for j in range(1, encoded2.shape[0] + 1):
+                # Scores from possible three directions
+                diagonal_score = score_matrix[i - 1, j - 1] + substitution_scores[nucleotide1, encoded2[j - 1]]
+                up_score = score_matrix[i - 1, j] + gap_penalty
+                left_score = score_matrix[i, j - 1] + gap_penalty
+
+                # Save the best score from the directions
+                best_score = max(up_score, diagonal_score, left_score)
+                if local and best_score < 0:  # Minimum 0 in local alignment
+                    best_score = 0
+                score_matrix[i, j] = best_score
+
+                # Pack possible paths for backtracking into direction bits
+                directional_matrix[i, j] = ((up_score == best_score) << 2
+                                            | (diagonal_score == best_score) << 1
+                                            | (left_score == best_score))
+
+    @njit(cache=True)
+    def fill_numba_rows(encoded1, encoded2, substitution_scores, gap_penalty, directional_matrix, band_width):
+        """Global-alignment fill keeping only two rolling score rows
+
+        Each cell depends only on the previous and the current row, so the full
+        score matrix never has to be materialized; returns the bottom-right score.
+        Only cells within band_width of the main diagonal are computed; cells
+        outside the band hold the OFF_BAND sentinel so no path crosses them.
+        """
+        n, m = encoded1.shape[0], encoded2.shape[0]
+        if m == 0:  # Empty seq2: the only alignment gaps out all of seq1
+            return n * gap_penalty
+        previous_row = np.empty(m + 1, dtype=np.int32)
+        current_row = np.empty(m + 1, dtype=np.int32)
+        for j in range(m + 1):
+            previous_row[j] = j * gap_penalty if j <= band_width else OFF_BAND
+
+        for i in range(1, n + 1):
+            nucleotide1 = encoded1[i - 1]
+            j_min = max(1, i - band_width)
+            j_max = min(m, i + band_width)
+            if j_min > j_max:  # The band has left the matrix; remaining rows hold no cells
+                break
+            current_row[j_min - 1] = i * gap_penalty if i <= band_width else OFF_BAND
+            for j in range(j_min, j_max + 1):
+                # Scores from possible three directions
+                diagonal_score = previous_row[j - 1] + substitution_scores[nucleotide1, encoded2[j - 1]]
+                up_score = previous_row[j] + gap_penalty
+                left_score = current_row[j - 1] + gap_penalty
+
+                # Save the best score from the directions
+                best_score = max(up_score, diagonal_score, left_score)
+                current_row[j] = best_score
+
+                # Pack possible paths for backtracking into direction bits
+                directional_matrix[i, j] = ((up_score == best_score) << 2
+                                            | (diagonal_score == best_score) << 1
+                                            | (left_score == best_score))
+            if j_max < m:  # Seal the band boundary read by the next row
+                current_row[j_max + 1] = OFF_BAND
+            previous_row, current_row = current_row, previous_row
+
+        return previous_row[m]
+
+    @njit(cache=True)
+    def fill_numba_rows_local(encoded1, encoded2, substitution_scores, gap_penalty, directional_matrix, band_width):
+        """Local-alignment fill keeping two rolling score rows and the running maxima
+
+        Tracks the maximum score and every coordinate where it occurs during the
+        fill (one compare per cell), so traceback needs neither a max scan nor an
+        argwhere pass over the score matrix. Cells with score 0 get no direction
+        bits, which is exactly where local traceback stops. Only cells within
+        band_width of the main diagonal are computed.
+        """
+        n, m = encoded1.shape[0], encoded2.shape[0]
+        previous_row = np.empty(m + 1, dtype=np.int32)
+        current_row = np.empty(m + 1, dtype=np.int32)
+        for j in range(m + 1):  # Same gap-penalty edges as the other fill paths
+            previous_row[j] = j * gap_penalty if j <= band_width else OFF_BAND
+        best_score = np.int32(0)
+        positions = np.empty((16, 2), dtype=np.int64)
+        count = 0
+
+        for i in range(1, n + 1):
+            nucleotide1 = encoded1[i - 1]
+            j_min = max(1, i - band_width)
+            j_max = min(m, i + band_width)
+            if j_min > j_max:  # The band has left the matrix; remaining rows hold no cells
+                break
+            current_row[j_min - 1] = i * gap_penalty if i <= band_width else OFF_BAND
+            for j in range(j_min, j_max + 1):
+                # Scores from possible three directions
+                diagonal_score = previous_row[j - 1] + substitution_scores[nucleotide1, encoded2[j - 1]]
+                up_score = previous_row[j] + gap_penalty
+                left_score = current_row[j - 1] + gap_penalty
+
+                # Save the best score from the directions, minimum 0
+                best = max(up_score, diagonal_score, left_score)
+                if best <= 0:
+                    current_row[j] = 0
+                    directional_matrix[i, j] = 0
+                    continue
+                current_row[j] = best
+
+                # Pack possible paths for backtracking into direction bits
+                directional_matrix[i, j] = ((up_score == best) << 2
+                                            | (diagonal_score == best) << 1
+                                            | (left_score == best))
+
+                # Track the running maximum and where it occurs
+                if best > best_score:
+                    best_score = best
+                    count = 0
+                if best == best_score:
+                    if count == positions.shape[0]:
+                        grown = np.empty((2 * count, 2), dtype=np.int64)
+                        grown[:count] = positions
+                        positions = grown
+                    positions[count, 0] = i
+                    positions[count, 1] = j
+                    count += 1
+            if j_max < m:  # Seal the band boundary read by the next row
+                current_row[j_max + 1] = OFF_BAND
+            previous_row, current_row = current_row, previous_row
+
+        if count == 0:  # No positive score anywhere: start from the empty alignment
+            positions[0, 0] = 0
+            positions[0, 1] = 0
+            count = 1
+        return best_score, positions[:count]
+
+    @njit(cache=True, parallel=True)
+    def fill_numba_parallel(encoded1, encoded2, substitution_scores, gap_penalty,
+                            score_matrix, directional_matrix, local):
+        """Anti-diagonal fill with the cells of each diagonal split across threads
+
+        Cells on one anti-diagonal are mutually independent, so each wavefront
+        is a prange loop; used for long sequences where the fill dominates.
+        """
+        n, m = encoded1.shape[0], encoded2.shape[0]
+        for k in range(2, n + m + 1):
+            i_min = max(1, k - m)
+            i_max = min(n, k - 1)
+            for i in prange(i_min, i_max + 1):
+                j = k - i
+
+                # Scores from possible three directions
+                diagonal_score = score_matrix[i - 1, j - 1] + substitution_scores[encoded1[i - 1], encoded2[j - 1]]
+                up_score = score_matrix[i - 1, j] + gap_penalty
+                left_score = score_matrix[i, j - 1] + gap_penalty
+
+                # Save the best score from the directions
+                best_score = max(up_score, diagonal_score, left_score)
+                if local and best_score < 0:  # Minimum 0 in local alignment
+                    best_score = 0
+                score_matrix[i, j] = best_score
+
+                # Pack possible paths for backtracking into direction bits
+                directional_matrix[i, j] = ((up_score == best_score) << 2
+                                            | (diagonal_score == best_score) << 1
+                                            | (left_score == best_score))
+
+    # One-time warmup on length-1 inputs so compilation happens at import, not first use
+    _warmup_seq = np.zeros(1, dtype=np.int8)
+    fill_numba(_warmup_seq, _warmup_seq, np.zeros((1, 1), dtype=np.int32), -2,
+               np.zeros((2, 2), dtype=np.int32), np.zeros((2, 2), dtype=np.uint8), False)
+    fill_numba_rows(_warmup_seq, _warmup_seq, np.zeros((1, 1), dtype=np.int32), -2,
+                    np.zeros((2, 2), dtype=np.uint8), 1)
+    fill_numba_rows_local(_warmup_seq, _warmup_seq, np.zeros((1, 1), dtype=np.int32), -2,
+                          np.zeros((2, 2), dtype=np.uint8), 1)
+    fill_numba_parallel(_warmup_seq, _warmup_seq, np.zeros((1, 1), dtype=np.int32), -2,
+                        np.zeros((2, 2), dtype=np.int32), np.zeros((2, 2), dtype=np.uint8), False)
@@ -15,6 +15,8 @@ class Parser:
                                  help="value of constant penalty for insertion a gap ('-') incurs")
         self.parser.add_argument('-o', '--output', type=str, required=True,
                                  help='output filename, file will be saved in \'/output\' directory')
+        self.parser.add_argument('-b', '--band_width', type=int, default=None,
+                                 help='compute only cells within this distance of the main diagonal')
 
     def get_parameters(self) -> tuple:
         return tuple(vars(self.parser.parse_args()).values())
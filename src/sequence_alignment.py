@@ -2,18 +2,33 @@
 # Smith–Waterman algorithm: https://en.wikipedia.org/wiki/Smith%E2%80%93Waterman_algorithm
 
 
+import csv
+import functools
 import os
-from collections import defaultdict
-from dataclasses import dataclass
 
 import numpy as np
-import pandas as pd
 from typing import List, Literal, Tuple
 
-from src.directional_cell import DirectionalCell
+from src import kernels
+
+
+@functools.lru_cache(maxsize=8)
+def _load_substitution_matrix(file_path: str, mtime: float) -> Tuple[dict, np.ndarray]:
+    """Loads a substitution matrix from a CSV file, cached per file and modification time
+
+    Batch workflows align many sequence pairs with the same matrix; caching on
+    (path, mtime) spares them re-parsing the CSV on every construction while
+    still picking up edits to the file.
+    """
+    with open(file_path, newline='') as file:
+        rows = list(csv.reader(file))
+
+    # Dense matrix of scores for all pairwise alignments, indexed by the nucleotide encoding
+    alphabet = {row[0]: i for i, row in enumerate(rows[1:])}
+    substitution_scores = np.array([[int(score) for score in row[1:]] for row in rows[1:]], dtype=np.int32)
+    return alphabet, substitution_scores
 
 
-@dataclass
 class SequenceAlignment:
     """A class implementing the Needleman–Wunsch and Smith–Waterman algorithms to perform alignment of two DNA sequences
 
@@ -26,16 +41,29 @@ class SequenceAlignment:
         input_filepath: File path to the substitution matrix in CSV format (see template substitution_matrix.csv)
         strategy: Global or local alignment strategy
         gap_penalty: The value of the constant penalty for inserting a gap ('-')
+        band_width: Optionally compute only cells within this distance of the main diagonal
     """
 
     def __init__(self, seq1: str, seq2: str, input_filepath: str,
-                 strategy: Literal['global', 'local'], gap_penalty: int = -2):
+                 strategy: Literal['global', 'local'], gap_penalty: int = -2, band_width: int = None):
         self.seq1 = seq1
         self.seq2 = seq2
         self.strategy = strategy
         self.gap_penalty = gap_penalty
+        self.band_width = band_width
 
-        self.alignments = self._load_substitution_matrix(input_filepath)
+        if band_width is not None:
+            if band_width < 1:
+                raise ValueError("band_width must be a positive integer.")
+            if strategy == 'global' and band_width < abs(len(seq1) - len(seq2)):
+                raise ValueError("band_width must be at least |len(seq1) - len(seq2)| for global alignment.")
+
+        self.alphabet, self.substitution_scores = _load_substitution_matrix(input_filepath,
+                                                                            os.path.getmtime(input_filepath))
+
+        # Sequences encoded once as int8 index arrays; the strings are kept for output formatting
+        self._encoded1 = self._encode(seq1, self.alphabet)
+        self._encoded2 = self._encode(seq2, self.alphabet)
 
     def find_optimal_alignments(self, n: int, output_filename: str):
         """Returns n optimal alignments based on the best score"""
@@ -44,66 +72,136 @@ class SequenceAlignment:
         self._print_and_save_solutions(solution_sequences, score, n, output_filename)
 
     @staticmethod
-    def _load_substitution_matrix(file_path: str):
-        # Load the substitution matrix from a CSV file
-        full_matrix = pd.read_csv(file_path, header=None)
-        seq1 = ''.join(full_matrix.iloc[1:, 0])
-        seq2 = ''.join(full_matrix.iloc[0, 1:])
-        substitution_matrix = np.asarray(full_matrix.iloc[1:, 1:], dtype=int)
-
-        # Score for all possible pairwise alignments of each nucleotide with every other nucleotide
-        alignments = defaultdict(lambda: defaultdict(lambda x: 0))
-        for i, nucleotide1 in enumerate(seq1):
-            for j, nucleotide2 in enumerate(seq2):
-                alignments[nucleotide1][nucleotide2] = substitution_matrix[i][j]
-        return alignments
+    def _encode(seq: str, alphabet: dict) -> np.ndarray:
+        # Map each nucleotide to its row/column index in the substitution matrix
+        lookup = np.full(256, -1, dtype=np.int8)
+        for nucleotide, index in alphabet.items():
+            lookup[ord(nucleotide)] = index
+
+        encoded = lookup[np.frombuffer(seq.encode(), dtype=np.uint8)]
+        if encoded.min(initial=0) < 0:
+            nucleotide = seq[int(np.argmin(encoded))]
+            raise ValueError(f"Nucleotide '{nucleotide}' is not in the substitution matrix alphabet.")
+        return encoded
+
+    @property
+    def score_matrix(self) -> np.ndarray:
+        # Rebuilt on demand when the fill kept only the rolling row buffers
+        if self._score_matrix is None:
+            self._fill_score_matrix()
+        return self._score_matrix
 
     def _create_score_and_directional_matrices(self):
         seq1, seq2 = self.seq1, self.seq2
+        encoded1, encoded2 = self._encoded1, self._encoded2
+
+        self.directional_matrix = np.zeros(shape=(len(seq1) + 1, len(seq2) + 1), dtype=np.uint8)
+
+        # Filling the edges of the directional matrix
+        self.directional_matrix[1:, 0] = kernels.UP
+        self.directional_matrix[0, 1:] = kernels.LEFT
+
+        # Dynamic programming matrix filling; a band restricted to the diagonal always
+        # goes through the row kernels since the other kernels compute every cell
+        if kernels.NUMBA_AVAILABLE and (self.band_width is not None
+                                        or min(len(seq1), len(seq2)) < kernels.PARALLEL_THRESHOLD):
+            # Each cell needs only the previous and current row, so the fill keeps
+            # two rolling row buffers instead of materializing the score matrix
+            self._score_matrix = None
+            band_width = self.band_width if self.band_width is not None else max(len(seq1), len(seq2))
+            if self.strategy == 'local':
+                self.best_score, self._max_positions = kernels.fill_numba_rows_local(
+                    encoded1, encoded2, self.substitution_scores, self.gap_penalty,
+                    self.directional_matrix, band_width)
+            else:
+                self.best_score = kernels.fill_numba_rows(encoded1, encoded2, self.substitution_scores,
+                                                          self.gap_penalty, self.directional_matrix, band_width)
+                self._max_positions = None
+        else:
+            self._fill_score_matrix()
+
+    def _fill_score_matrix(self):
+        seq1, seq2 = self.seq1, self.seq2
+        encoded1, encoded2 = self._encoded1, self._encoded2
+        substitution_scores = self.substitution_scores
 
-        self.score_matrix = np.zeros(shape=(len(seq1) + 1, len(seq2) + 1), dtype=int)
-        self.directional_matrix = np.full(shape=(len(seq1) + 1, len(seq2) + 1), fill_value=DirectionalCell())
+        self._score_matrix = np.zeros(shape=(len(seq1) + 1, len(seq2) + 1), dtype=np.int32)
 
-        # Filling the edges with the score and directional matrices
-        for i in range(1, len(seq1) + 1):
-            self.score_matrix[i, 0] = i * self.gap_penalty
-            self.directional_matrix[i, 0] = DirectionalCell(up=True)
-        for i in range(1, len(seq2) + 1):
-            self.score_matrix[0, i] = i * self.gap_penalty
-            self.directional_matrix[0, i] = DirectionalCell(left=True)
+        # Filling the edges of the score matrix; with a band only cells within
+        # band_width of the diagonal are real, everything else is a sentinel
+        if self.band_width is not None:
+            self._score_matrix.fill(kernels.OFF_BAND)
+            self._score_matrix[0, 0] = 0
+        edge1 = len(seq1) if self.band_width is None else min(len(seq1), self.band_width)
+        edge2 = len(seq2) if self.band_width is None else min(len(seq2), self.band_width)
+        self._score_matrix[1:edge1 + 1, 0] = np.arange(1, edge1 + 1, dtype=np.int32) * self.gap_penalty
+        self._score_matrix[0, 1:edge2 + 1] = np.arange(1, edge2 + 1, dtype=np.int32) * self.gap_penalty
+
+        if self.band_width is not None:
+            self._fill_python(encoded1, encoded2, substitution_scores)
+        elif kernels.NUMBA_AVAILABLE and min(len(seq1), len(seq2)) >= kernels.PARALLEL_THRESHOLD:
+            kernels.fill_numba_parallel(encoded1, encoded2, substitution_scores, self.gap_penalty,
+                                        self._score_matrix, self.directional_matrix, self.strategy == 'local')
+        elif kernels.SIMD_AVAILABLE:
+            kernels.fill_simd(encoded1, encoded2, substitution_scores, self.gap_penalty,
+                              self._score_matrix, self.directional_matrix, self.strategy == 'local')
+        elif kernels.NUMBA_AVAILABLE:
+            kernels.fill_numba(encoded1, encoded2, substitution_scores, self.gap_penalty,
+                               self._score_matrix, self.directional_matrix, self.strategy == 'local')
+        elif len(seq1) * len(seq2) >= kernels.VECTORIZE_THRESHOLD:
+            kernels.fill_numpy(encoded1, encoded2, substitution_scores, self.gap_penalty,
+                               self._score_matrix, self.directional_matrix, self.strategy == 'local')
+        else:
+            self._fill_python(encoded1, encoded2, substitution_scores)
+
+        # The alignment score under each strategy, plus the maxima local traceback starts from
+        if self.strategy == 'local':
+            self.best_score = np.max(self._score_matrix)
+            self._max_positions = np.argwhere(self._score_matrix == self.best_score)
+        else:
+            self.best_score = self._score_matrix[-1, -1]
+            self._max_positions = None
+
+    def _fill_python(self, encoded1, encoded2, substitution_scores):
+        # Pure-Python fallback of the filling loop, used when numba is not installed
+        band_width = self.band_width if self.band_width is not None else max(len(encoded1), len(encoded2))
+        for i, nucleotide1 in enumerate(encoded1):
+            for j in range(max(0, i - band_width), min(len(encoded2), i + band_width + 1)):
+                nucleotide2 = encoded2[j]
 
-        # Dynamic programming matrix filling
-        for i, nucleotide1 in enumerate(seq1):
-            for j, nucleotide2 in enumerate(seq2):
                 # Scores from possible three directions
-                diagonal_score = self.score_matrix[i, j] + self.alignments[nucleotide1][nucleotide2]
-                up_score = self.score_matrix[i, j + 1] + self.gap_penalty
-                left_score = self.score_matrix[i + 1, j] + self.gap_penalty
+                diagonal_score = self._score_matrix[i, j] + substitution_scores[nucleotide1, nucleotide2]
+                up_score = self._score_matrix[i, j + 1] + self.gap_penalty
+                left_score = self._score_matrix[i + 1, j] + self.gap_penalty
 
                 # Save the best score from the directions
-                best_score = np.max([up_score, diagonal_score, left_score])
+                best_score = max(up_score, diagonal_score, left_score)
                 if self.strategy == 'local':  # Minimum 0 in local alignment
                     best_score = max(best_score, 0)
-                self.score_matrix[i + 1, j + 1] = best_score
+                self._score_matrix[i + 1, j + 1] = best_score
 
-                # Create an object representing possible paths for backtracking
-                directional_cell = DirectionalCell(up=(up_score == best_score),
-                                                   diagonal=(diagonal_score == best_score),
-                                                   left=(left_score == best_score))
-                self.directional_matrix[i + 1, j + 1] = directional_cell
+                # Pack possible paths for backtracking into direction bits
+                self.directional_matrix[i + 1, j + 1] = ((up_score == best_score) << 2
+                                                         | (diagonal_score == best_score) << 1
+                                                         | (left_score == best_score))
 
     def _traceback(self, n) -> Tuple[list, int]:
         # Create solution states representing the current cell with trace [posY, posX, seq1, seq2]
         match self.strategy:
             case 'global':  # From the bottom right cell
-                max_score = self.score_matrix[-1, -1]
-                solution_states = [list(self.directional_matrix[1:, 1:].shape) + ['', '']]
-            case 'local':  # All cells with the maximum score
-                max_score = np.max(self.score_matrix)
-                solution_states = [cell + ['', ''] for cell in np.argwhere(self.score_matrix == max_score).tolist()]
+                max_score = self.best_score
+                solution_states = [list(self.directional_matrix[1:, 1:].shape) + [bytearray(), bytearray()]]
+            case 'local':  # All cells with the maximum score, collected during the fill
+                max_score = self.best_score
+                solution_states = [cell + [bytearray(), bytearray()]
+                                   for cell in self._max_positions.tolist()]
             case _:
                 raise AttributeError("Strategy must be 'global' or 'local'.")
 
+        # Sequences as bytes for cheap single-nucleotide indexing in the loop
+        bytes1, bytes2 = self.seq1.encode(), self.seq2.encode()
+        gap = ord('-')
+
         # Go deeper into the path you last traveled and add new possible solutions
         solution_sequences = set()
         while solution_states and len(solution_sequences) < n:
@@ -111,19 +209,30 @@ class SequenceAlignment:
             cell = self.directional_matrix[posY][posX]
 
             # Finish travel if no more possible directions or value of cell equals to 0 in local alignment
-            if cell.num_directions == 0 or (self.strategy == 'local' and self.score_matrix[posY, posX] == 0):
-                solution_sequences.add((seq1, seq2))
+            # (the row-buffer local kernel already clears the bits of zero cells, so _score_matrix
+            # is only consulted when a full matrix was materialized)
+            if cell == 0 or (self.strategy == 'local' and self._score_matrix is not None
+                             and self._score_matrix[posY, posX] == 0):
+                solution_sequences.add((seq1.decode(), seq2.decode()))
 
             # Add new possible solutions in three directions if there are any
-            # Update cell position and sequences adding a single nucleotide or gap '-'
+            # Update cell position and sequences appending a single nucleotide or gap '-'
             else:
-                up, diagonal, left = cell.get_directions()
-                if left:
-                    solution_states.append([posY, posX - 1, seq1 + '-', seq2 + self.seq2[-posX]])
-                if up:
-                    solution_states.append([posY - 1, posX, seq1 + self.seq1[-posY], seq2 + '-'])
-                if diagonal:
-                    solution_states.append([posY - 1, posX - 1, seq1 + self.seq1[-posY], seq2 + self.seq2[-posX]])
+                branches = []
+                if cell & kernels.LEFT:
+                    branches.append([posY, posX - 1, gap, bytes2[-posX]])
+                if cell & kernels.UP:
+                    branches.append([posY - 1, posX, bytes1[-posY], gap])
+                if cell & kernels.DIAGONAL:
+                    branches.append([posY - 1, posX - 1, bytes1[-posY], bytes2[-posX]])
+
+                # Copy the accumulators only where the path branches; the last branch extends them in place
+                for newY, newX, nucleotide1, nucleotide2 in branches[:-1]:
+                    solution_states.append([newY, newX, seq1 + bytes([nucleotide1]), seq2 + bytes([nucleotide2])])
+                newY, newX, nucleotide1, nucleotide2 = branches[-1]
+                seq1.append(nucleotide1)
+                seq2.append(nucleotide2)
+                solution_states.append([newY, newX, seq1, seq2])
 
         return sorted(solution_sequences, reverse=True), max_score
 
@@ -140,8 +249,7 @@ class SequenceAlignment:
         print(text)
 
         # Create directory if needed
-        if output_dir not in os.listdir():
-            os.mkdir(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
 
         # Save the solution
         with open(os.path.join(output_dir, output_filename), 'w') as f:
@@ -1,71 +1,121 @@
 import argparse
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
 
-import pandas as pd
+import numpy as np
 
-from src.directional_cell import DirectionalCell
-from src.sequence_alignment import SequenceAlignment
+from src import kernels
+from src.sequence_alignment import SequenceAlignment, _load_substitution_matrix
 from src.parser import NeedlemanWunschParser, SmitchWatermanParser
 
 
-class TestDirectionalCell(unittest.TestCase):
-    def test_direction_initialization(self):
-        # Test with all directions True
-        cell = DirectionalCell(up=True, diagonal=True, left=True)
-        self.assertEqual(cell.num_directions, 3)
-        self.assertEqual(cell.get_directions(), (True, True, True))
-
-        # Test with only 'up' direction True
-        cell = DirectionalCell(up=True)
-        self.assertEqual(cell.num_directions, 1)
-        self.assertEqual(cell.get_directions(), (True, False, False))
-
-        # Test with no directions True
-        cell = DirectionalCell()
-        self.assertEqual(cell.num_directions, 0)
-        self.assertEqual(cell.get_directions(), (False, False, False))
-
-
 class TestSequenceAlignment(unittest.TestCase):
-    # Mock CSV data for substitution matrix
-    mock_data = [["", "A", "C", "G", "T"],
-                 ["A", 1, -1, -2, -1],
-                 ["C", -1, 1, -1, -2],
-                 ["G", -2, -1, 1, -1],
-                 ["T", -1, -2, -1, 1]]
-
-    @patch('src.sequence_alignment.pd.read_csv')
-    def test_load_substitution_matrix(self, mock_read_csv):
-        mock_read_csv.return_value = pd.DataFrame(self.mock_data)
-        sequence_alignment = SequenceAlignment(seq1="ACGT", seq2="TGCA", input_filepath="dummy.csv", strategy="global", gap_penalty=-2)
-        alignments = sequence_alignment._load_substitution_matrix("dummy.csv")
-
-        self.assertEqual(alignments['A']['A'], 1)
-        self.assertEqual(alignments['A']['T'], -1)
-        self.assertEqual(alignments['G']['C'], -1)
-
-    @patch('src.sequence_alignment.pd.read_csv')
-    def test_create_score_and_directional_matrices(self, mock_read_csv):
-        mock_read_csv.return_value = pd.DataFrame(self.mock_data)
-
-        alignment = SequenceAlignment(seq1="A", seq2="T", input_filepath="dummy.csv", strategy="global", gap_penalty=-2)
-        alignment.alignments = {'A': {'A': 1, 'T': -1}, 'T': {'A': -1, 'T': 1}}
+    # Substitution matrix written to a temporary CSV file for the tests
+    matrix_csv = (",A,C,G,T\n"
+                  "A,1,-1,-2,-1\n"
+                  "C,-1,1,-1,-2\n"
+                  "G,-2,-1,1,-1\n"
+                  "T,-1,-2,-1,1\n")
+    substitution_scores = np.array([[1, -1, -2, -1],
+                                    [-1, 1, -1, -2],
+                                    [-2, -1, 1, -1],
+                                    [-1, -2, -1, 1]], dtype=np.int32)
+
+    @classmethod
+    def setUpClass(cls):
+        matrix_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        matrix_file.write(cls.matrix_csv)
+        matrix_file.close()
+        cls.matrix_path = matrix_file.name
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.matrix_path)
+
+    def test_load_substitution_matrix(self):
+        alphabet, substitution_scores = _load_substitution_matrix(self.matrix_path,
+                                                                  os.path.getmtime(self.matrix_path))
+
+        self.assertEqual(alphabet, {'A': 0, 'C': 1, 'G': 2, 'T': 3})
+        self.assertEqual(substitution_scores[alphabet['A'], alphabet['A']], 1)
+        self.assertEqual(substitution_scores[alphabet['A'], alphabet['T']], -1)
+        self.assertEqual(substitution_scores[alphabet['G'], alphabet['C']], -1)
+
+    def test_encode_rejects_unknown_nucleotide(self):
+        with self.assertRaises(ValueError):
+            SequenceAlignment(seq1="ANGT", seq2="ACGT", input_filepath=self.matrix_path,
+                              strategy="global", gap_penalty=-2)
+
+    def test_create_score_and_directional_matrices(self):
+        alignment = SequenceAlignment(seq1="A", seq2="T", input_filepath=self.matrix_path,
+                                      strategy="global", gap_penalty=-2)
         alignment._create_score_and_directional_matrices()
 
         # Check score matrix shape and values
         self.assertEqual(alignment.score_matrix.shape, (2, 2))
         self.assertEqual(alignment.score_matrix[1, 1], -1)
 
-        # Check directional matrix types
-        self.assertIsInstance(alignment.directional_matrix[1, 1], DirectionalCell)
-
-    @patch('src.sequence_alignment.pd.read_csv')
-    def test_find_optimal_alignments_global(self, mock_read_csv):
-        mock_read_csv.return_value = pd.DataFrame(self.mock_data)
-
-        alignment = SequenceAlignment(seq1="A", seq2="A", input_filepath="dummy.csv", strategy="global", gap_penalty=-2)
-        alignment.alignments = {'A': {'A': 1}}
+        # Check directional matrix direction bits
+        self.assertEqual(alignment.directional_matrix.dtype, np.uint8)
+        self.assertEqual(alignment.directional_matrix[1, 1], kernels.DIAGONAL)
+
+    def test_vectorized_fill_matches_python_fill(self):
+        for strategy in ('global', 'local'):
+            alignment = SequenceAlignment(seq1="GATTACA", seq2="GCATGCTA", input_filepath=self.matrix_path,
+                                          strategy=strategy)
+
+            # Fill once through the vectorized anti-diagonal path and once through the Python loop
+            with patch.object(kernels, 'SIMD_AVAILABLE', False), patch.object(kernels, 'NUMBA_AVAILABLE', False):
+                with patch.object(kernels, 'VECTORIZE_THRESHOLD', 0):
+                    alignment._create_score_and_directional_matrices()
+                    vectorized_score = alignment.score_matrix
+                    vectorized_directions = alignment.directional_matrix
+                with patch.object(kernels, 'VECTORIZE_THRESHOLD', 10 ** 9):
+                    alignment._create_score_and_directional_matrices()
+
+            np.testing.assert_array_equal(vectorized_score, alignment.score_matrix)
+            np.testing.assert_array_equal(vectorized_directions, alignment.directional_matrix)
+
+    @unittest.skipUnless(kernels.NUMBA_AVAILABLE, 'numba not installed')
+    def test_parallel_fill_matches_sequential_fill(self):
+        rng = np.random.default_rng(seed=0)
+        encoded1 = rng.integers(0, 4, size=61).astype(np.int8)
+        encoded2 = rng.integers(0, 4, size=47).astype(np.int8)
+
+        for local in (False, True):
+            matrices = []
+            for fill in (kernels.fill_numba, kernels.fill_numba_parallel):
+                score_matrix = np.zeros((62, 48), dtype=np.int32)
+                score_matrix[1:, 0] = np.arange(1, 62) * -2
+                score_matrix[0, 1:] = np.arange(1, 48) * -2
+                directional_matrix = np.zeros((62, 48), dtype=np.uint8)
+                fill(encoded1, encoded2, self.substitution_scores, -2, score_matrix, directional_matrix, local)
+                matrices.append((score_matrix, directional_matrix))
+
+            np.testing.assert_array_equal(matrices[0][0], matrices[1][0])
+            np.testing.assert_array_equal(matrices[0][1], matrices[1][1])
+
+    @unittest.skipUnless(kernels.SIMD_AVAILABLE, 'C kernel not built')
+    def test_simd_fill_matches_python_fill(self):
+        for strategy in ('global', 'local'):
+            alignment = SequenceAlignment(seq1="GATTACA", seq2="GCATGCTA", input_filepath=self.matrix_path,
+                                          strategy=strategy)
+
+            alignment._create_score_and_directional_matrices()
+            simd_score = alignment.score_matrix
+            simd_directions = alignment.directional_matrix
+            with patch.object(kernels, 'SIMD_AVAILABLE', False), patch.object(kernels, 'NUMBA_AVAILABLE', False):
+                with patch.object(kernels, 'VECTORIZE_THRESHOLD', 10 ** 9):
+                    alignment._create_score_and_directional_matrices()
+
+            np.testing.assert_array_equal(simd_score, alignment.score_matrix)
+            np.testing.assert_array_equal(simd_directions, alignment.directional_matrix)
+
+    def test_find_optimal_alignments_global(self):
+        alignment = SequenceAlignment(seq1="A", seq2="A", input_filepath=self.matrix_path,
+                                      strategy="global", gap_penalty=-2)
 
         # Run optimal alignment search
         alignment._create_score_and_directional_matrices()
@@ -75,27 +125,80 @@ class TestSequenceAlignment(unittest.TestCase):
         self.assertEqual(score, 1)
         self.assertEqual(solutions[0], ("A", "A"))
 
+    def test_find_optimal_alignments_local(self):
+        alignment = SequenceAlignment(seq1="ACGT", seq2="CGTA", input_filepath=self.matrix_path,
+                                      strategy="local", gap_penalty=-2)
+
+        # Run optimal alignment search
+        alignment._create_score_and_directional_matrices()
+        solutions, score = alignment._traceback(1)
+
+        self.assertEqual(score, 2)
+        self.assertEqual(solutions[0], ("AC", "GT"))
+
+    def test_banded_alignment_matches_full(self):
+        # A band covering the whole matrix must reproduce the unbanded result
+        for strategy in ('global', 'local'):
+            full = SequenceAlignment(seq1="GATTACA", seq2="GCATGCTA", input_filepath=self.matrix_path,
+                                     strategy=strategy)
+            banded = SequenceAlignment(seq1="GATTACA", seq2="GCATGCTA", input_filepath=self.matrix_path,
+                                       strategy=strategy, band_width=8)
+            full._create_score_and_directional_matrices()
+            banded._create_score_and_directional_matrices()
+
+            self.assertEqual(full._traceback(3), banded._traceback(3))
+
+    def test_banded_local_alignment_with_asymmetric_lengths(self):
+        # A band far narrower than the length difference used to overrun the row buffers
+        alignment = SequenceAlignment(seq1="CAAGATCGGGACTCGGTCTCC", seq2="GGTA", input_filepath=self.matrix_path,
+                                      strategy="local", band_width=1)
+        alignment._create_score_and_directional_matrices()
+        solutions, score = alignment._traceback(3)
+
+        # The Python fallback fill must agree with the banded row kernel
+        with patch.object(kernels, 'NUMBA_AVAILABLE', False):
+            alignment._create_score_and_directional_matrices()
+        self.assertEqual((solutions, score), alignment._traceback(3))
+
+    def test_global_alignment_with_empty_sequence(self):
+        # An empty seq2 used to return score 0 from the row kernel instead of gapping out seq1
+        alignment = SequenceAlignment(seq1="ACGT", seq2="", input_filepath=self.matrix_path,
+                                      strategy="global", gap_penalty=-2)
+        alignment._create_score_and_directional_matrices()
+        solutions, score = alignment._traceback(1)
+
+        self.assertEqual(score, -8)
+        self.assertEqual(solutions[0], ("ACGT", "----"))
+
+    def test_band_width_validation(self):
+        with self.assertRaises(ValueError):
+            SequenceAlignment(seq1="A", seq2="AAAAA", input_filepath=self.matrix_path,
+                              strategy="global", band_width=2)
+        with self.assertRaises(ValueError):
+            SequenceAlignment(seq1="ACGT", seq2="ACGT", input_filepath=self.matrix_path,
+                              strategy="local", band_width=0)
+
 
 class TestParsers(unittest.TestCase):
     @patch('argparse.ArgumentParser.parse_args')
     def test_needleman_wunsch_parser(self, mock_args):
         mock_args.return_value = argparse.Namespace(seq1="ACGT", seq2="TGCA", n=1, substitution_matrix="matrix.csv",
-                                                    gap_penalty=-2, output="output.txt")
+                                                    gap_penalty=-2, output="output.txt", band_width=None)
 
         parser = NeedlemanWunschParser()
         params = parser.get_parameters()
 
-        self.assertEqual(params, ("ACGT", "TGCA", 1, "matrix.csv", -2, "output.txt"))
+        self.assertEqual(params, ("ACGT", "TGCA", 1, "matrix.csv", -2, "output.txt", None))
 
     @patch('argparse.ArgumentParser.parse_args')
     def test_smith_waterman_parser(self, mock_args):
         mock_args.return_value = argparse.Namespace(seq1="ACGT", seq2="TGCA", n=2, substitution_matrix="matrix.csv",
-                                                    gap_penalty=-1, output="output_sw.txt")
+                                                    gap_penalty=-1, output="output_sw.txt", band_width=3)
 
         parser = SmitchWatermanParser()
         params = parser.get_parameters()
 
-        self.assertEqual(params, ("ACGT", "TGCA", 2, "matrix.csv", -1, "output_sw.txt"))
+        self.assertEqual(params, ("ACGT", "TGCA", 2, "matrix.csv", -1, "output_sw.txt", 3))
 
 
 if __name__ == '__main__':